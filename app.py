@@ -1,4 +1,10 @@
-from typing import Dict, Iterable, List, Tuple
+from typing import Callable, Dict, Iterable, List, Tuple
+import cProfile
+import functools
+import os
+import random
+import re
+import time
 import dash
 from dash import dcc
 from dash import html
@@ -25,6 +31,11 @@ YAXIS_RANGE = 300, 600, 1000, 1600
 LABEL = 'label'
 VALUE = 'value'
 
+# Callback profiling, disabled unless PROFILE_DIR is set
+PROFILE_DIR = os.environ.get('PROFILE_DIR')
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+PROFILE_MIN_SECONDS = float(os.environ.get('PROFILE_MIN_SECONDS', 0))
+
 # First Known COVID-19 Case in California
 ABSOLUTE_FIRST_DAY = pd.to_datetime('2020-01-26')
 
@@ -80,6 +91,39 @@ def id_to_place(county, id_):
         f'The ID {id_} in {county} County could not be converted to place.')
 
 
+def profile_callback(func: Callable) -> Callable:
+    """Write a cProfile dump for sampled or slow calls to a callback.
+
+    Returns the callback unchanged when PROFILE_DIR is unset. Otherwise a
+    call is profiled if it is sampled at PROFILE_SAMPLE_RATE; when
+    PROFILE_MIN_SECONDS is set, every call is profiled and the dump is
+    kept only if the call took at least that long.
+    """
+    if not PROFILE_DIR:
+        return func
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+
+    @functools.wraps(func)
+    def wrapper(*args):
+        sampled = random.random() < PROFILE_SAMPLE_RATE
+        if not (sampled or PROFILE_MIN_SECONDS > 0):
+            return func(*args)
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        try:
+            return profiler.runcall(func, *args)
+        finally:
+            elapsed = time.perf_counter() - start
+            if sampled or elapsed >= PROFILE_MIN_SECONDS:
+                inputs = re.sub(r'[^\w.-]+', '_', '-'.join(map(str, args)))
+                profiler.dump_stats(
+                    os.path.join(
+                        PROFILE_DIR, f'{func.__name__}-{time.time_ns()}-'
+                        f'{elapsed * 1000:.0f}ms-{inputs[:100]}.prof'))
+
+    return wrapper
+
+
 with open('footnotes.md') as f:
     FOOTNOTES = f.read()
 
@@ -186,6 +230,7 @@ def place_label(data_src):
               Input('selected-county', 'value'),
               Input('selected-data-source', 'value'),
               Input('selected-place-value', 'value'))
+@profile_callback
 def place_value(county, data_src, orig_place):
     if data_src == LACDPH:
         place_options = LACDPH_CSA_LIST
@@ -207,6 +252,7 @@ def place_value(county, data_src, orig_place):
               Input('time-selector', 'value'),
               Input('observational-period', 'value'),
               Input('selected-data-source', 'value'))
+@profile_callback
 def update_general_graph(county, place, date_range, obs_period, data_source):
     if data_source == LACDPH:
         return update_lacdph_graph(place, date_range, obs_period)